@@ -10,6 +10,7 @@ import time
 import os
 import tempfile
 from urllib import urlencode
+from cookielib import CookieJar
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from poster.streaminghttp import get_handlers
@@ -59,12 +60,7 @@ def get_proxies_for_handler(proxy_settings):
                                 proxy_settings.server,
                                 proxy_settings.port)
         proxies = {proxy_settings.proxy_type: proxy_string}
-        if proxy_settings.exceptions.strip():
-            proxy_exceptions = [e.strip() for e in
-                                proxy_settings.exceptions.split(',')]
-        else:
-            proxy_exceptions = None
-        return proxies, proxy_exceptions
+        return proxies, proxy_settings.parsed_exceptions
 
 
 def get_proxy_handler(proxies, proxy_exceptions=None, url=None):
@@ -84,6 +80,28 @@ def get_proxy_handler(proxies, proxy_exceptions=None, url=None):
         return urllib2.ProxyHandler(proxies)
 
 
+class SyncCookieJar(CookieJar):
+    """Cookie jar that can be shared by clients running in several threads
+
+    CookieJar already holds its lock when adding or extracting cookies but
+    not when iterating over them: take a snapshot of the cookies under the
+    same lock instead.
+    """
+
+    def _snapshot(self):
+        self._cookies_lock.acquire()
+        try:
+            return [cookie for cookie in CookieJar.__iter__(self)]
+        finally:
+            self._cookies_lock.release()
+
+    def __iter__(self):
+        return iter(self._snapshot())
+
+    def __len__(self):
+        return len(self._snapshot())
+
+
 class Unauthorized(Exception):
 
     def __init__(self, server_url, user_id, code=403):
@@ -16,6 +16,7 @@ from nxdrive.controller import Controller
 from nxdrive.daemon import daemonize
 from nxdrive.controller import default_nuxeo_drive_folder
 from nxdrive.logging_config import configure
+from nxdrive.logging_config import close_log_files
 from nxdrive.logging_config import get_logger
 from nxdrive.protocol_handler import parse_protocol_url
 from nxdrive.protocol_handler import register_protocol_handlers
@@ -348,8 +349,9 @@ class CliHandler(object):
 
     def start(self, options=None):
         """Launch the synchronization in a daemonized process (under POSIX)"""
-        # Close DB connections before Daemonization
+        # Close DB connections and log files before Daemonization
         self.controller.dispose()
+        close_log_files()
         daemonize()
 
         self.controller = Controller(options.nxdrive_home,
@@ -481,7 +483,8 @@ def dumpstacks(signal, frame):
                         % (filename, lineno, name))
             if line:
                 code.append("  %s" % (line.strip()))
-    print "\n".join(code)
+    # Log the dump: the standard output of the daemon goes to /dev/null
+    get_logger(__name__).info("Thread dump:\n%s", "\n".join(code))
 
 
 def main(argv=None):
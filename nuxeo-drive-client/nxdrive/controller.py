@@ -2,18 +2,22 @@
 
 import os
 import sys
-from urllib import quote
 from threading import local
 import subprocess
+from distutils.spawn import find_executable
+from time import time
 from datetime import datetime
 from datetime import timedelta
-import calendar
-
-from cookielib import CookieJar
+from collections import defaultdict
 
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.orm import object_session
 from sqlalchemy import asc
 from sqlalchemy import or_
+from sqlalchemy import and_
+from sqlalchemy import select
+from sqlalchemy import union_all
+from sqlalchemy import bindparam
 
 import nxdrive
 from nxdrive.client import Unauthorized
@@ -21,6 +25,7 @@ from nxdrive.client import LocalClient
 from nxdrive.client import RemoteFileSystemClient
 from nxdrive.client import RemoteDocumentClient
 from nxdrive.client.base_automation_client import get_proxies_for_handler
+from nxdrive.client.base_automation_client import SyncCookieJar
 from nxdrive.client import NotFound
 from nxdrive.model import init_db
 from nxdrive.model import DeviceConfig
@@ -37,16 +42,76 @@ from nxdrive.utils import decrypt
 
 log = get_logger(__name__)
 
+# Read only query of the states under a folder, see
+# Controller._get_tree_children_getter: one branch per path (local and remote)
+# so that SQLite can use an index range scan for each of them instead of a
+# full scan for an OR predicate. Comparisons with NULL bounds never match,
+# hence passing None bounds disables the matching branch.
+_states = LastKnownState.__table__
+_tree_states_columns = [
+    _states.c.id,
+    _states.c.local_path,
+    _states.c.local_parent_path,
+    _states.c.local_name,
+    _states.c.remote_ref,
+    _states.c.remote_parent_ref,
+    _states.c.remote_name,
+    _states.c.folderish,
+    _states.c.pair_state,
+]
+_local_folder_param = bindparam('local_folder')
+_TREE_STATES_QUERY = union_all(
+    select(_tree_states_columns).where(and_(
+        _states.c.local_folder == _local_folder_param,
+        _states.c.local_path >= bindparam('local_min'),
+        _states.c.local_path < bindparam('local_max'),
+    )),
+    select(_tree_states_columns).where(and_(
+        _states.c.local_folder == _local_folder_param,
+        _states.c.remote_parent_path >= bindparam('remote_min'),
+        _states.c.remote_parent_path < bindparam('remote_max'),
+    )),
+)
+
 
 class MissingToken(Exception):
     pass
 
 
+# Absolute paths of the programs used to open local files
+_launchers = dict()
+
+
+def find_launcher(name):
+    """Return the absolute path of a program found in the PATH or None
+
+    The lookup is only done once per program found: a missing program is
+    looked up again on the next call as it might have been installed since.
+    """
+    launcher = _launchers.get(name)
+    if launcher is None:
+        launcher = find_executable(name)
+        if launcher is not None:
+            _launchers[name] = launcher
+    return launcher
+
+
+# Resolved on first call as the home folder layout does not change at runtime
+_default_nuxeo_drive_folder = None
+
+
 def default_nuxeo_drive_folder():
     """Find a reasonable location for the root Nuxeo Drive folder
 
     This folder is user specific, typically under the home folder.
     """
+    global _default_nuxeo_drive_folder
+    if _default_nuxeo_drive_folder is None:
+        _default_nuxeo_drive_folder = _find_default_nuxeo_drive_folder()
+    return _default_nuxeo_drive_folder
+
+
+def _find_default_nuxeo_drive_folder():
     if sys.platform == "win32":
         # WARNING: it's important to check `Documents` first as under Windows 7
         # there also exists a `My Documents` folder invisible in the explorer
@@ -99,6 +164,21 @@ class ProxySettings(object):
         self.username = username
         self.password = password
         self.exceptions = exceptions
+        self._parsed_exceptions = None
+
+    @property
+    def parsed_exceptions(self):
+        """List of hosts not to use the proxy for or None
+
+        Parsed once from the comma separated exceptions string.
+        """
+        parsed = self._parsed_exceptions
+        if parsed is None or parsed[0] != self.exceptions:
+            hosts = None
+            if self.exceptions is not None and self.exceptions.strip():
+                hosts = [e.strip() for e in self.exceptions.split(',')]
+            parsed = self._parsed_exceptions = (self.exceptions, hosts)
+        return parsed[1]
 
     def __repr__(self):
         return ("ProxySettings<config=%s, proxy_type=%s, server=%s, port=%s, "
@@ -140,7 +220,9 @@ class Controller(object):
         self.timeout = timeout
 
         # Handle connection to the local Nuxeo Drive configuration and
-        # metadata sqlite database.
+        # metadata sqlite database. The session maker is a scoped_session
+        # registry: each thread reuses the same session (and identity map)
+        # until remove_session is called.
         self._engine, self._session_maker = init_db(
             self.config_folder, echo=echo, poolclass=poolclass)
 
@@ -148,23 +230,35 @@ class Controller(object):
         self._local = local()
         self._client_cache_timestamps = dict()
 
+        # Token of the first server binding, invalidated on binding updates
+        self._first_token = None
+
+        # Local folders of the server bindings, loaded lazily and reset on
+        # binding updates
+        self._binding_folders = None
+
         self._remote_error = None
 
-        device_config = self.get_device_config()
+        # Finder favorite list handle, see register_folder_link_darwin
+        self._finder_favorites = None
+
+        session = self.get_session()
+        device_config = self.get_device_config(session)
         self.device_id = device_config.device_id
         self.version = nxdrive.__version__
-        self.update_version(device_config)
+        self.update_version(device_config, session=session)
 
         # HTTP proxy settings
         self.proxies = None
         self.proxy_exceptions = None
-        self.refresh_proxies(device_config=device_config)
+        self._proxy_settings_key = None
+        self.refresh_proxies(device_config=device_config, session=session)
 
         self.synchronizer = Synchronizer(self, page_size=page_size)
 
         # Make all the automation client related to this controller
         # share cookies using threadsafe jar
-        self.cookie_jar = CookieJar()
+        self.cookie_jar = SyncCookieJar()
 
     def get_session(self):
         """Reuse the thread local session for this controller
@@ -174,22 +268,38 @@ class Controller(object):
         """
         return self._session_maker()
 
+    def remove_session(self):
+        """Close and discard the session bound to the current thread
+
+        Should be called by long running threads before they terminate so
+        that the session registry does not keep a reference to their session.
+        """
+        self._session_maker.remove()
+
     def get_device_config(self, session=None):
-        """Fetch the singleton configuration object for this device"""
+        """Fetch the singleton configuration object for this device
+
+        The instance is cached for the session it is attached to.
+        """
         if session is None:
             session = self.get_session()
+        device_config = getattr(self._local, 'device_config', None)
+        if (device_config is not None
+            and object_session(device_config) is session):
+            return device_config
         try:
-            return session.query(DeviceConfig).one()
+            device_config = session.query(DeviceConfig).one()
         except NoResultFound:
             device_config = DeviceConfig()  # generate a unique device id
             session.add(device_config)
             session.commit()
-            return device_config
+        self._local.device_config = device_config
+        return device_config
 
     def get_version(self):
         return self.version
 
-    def update_version(self, device_config):
+    def update_version(self, device_config, session=None):
         if self.version != device_config.client_version:
             log.debug("Detected version upgrade: current version = %s,"
                       " new version = %s => upgrading current version,"
@@ -197,14 +307,16 @@ class Controller(object):
                       device_config.client_version,
                       self.version)
             device_config.client_version = self.version
-            self.get_session().commit()
+            session = self.get_session() if session is None else session
+            session.commit()
 
-    def get_proxy_settings(self, device_config=None):
+    def get_proxy_settings(self, device_config=None, session=None):
         """Fetch proxy settings from database"""
-        dc = (self.get_device_config() if device_config is None
+        session = self.get_session() if session is None else session
+        dc = (self.get_device_config(session) if device_config is None
               else device_config)
         # Decrypt password with token as the secret
-        token = self.get_first_token()
+        token = self.get_first_token(session)
         if dc.proxy_password is not None and token is not None:
             password = decrypt(dc.proxy_password, token)
         else:
@@ -232,7 +344,7 @@ class Controller(object):
         device_config.proxy_authenticated = proxy_settings.authenticated
         device_config.proxy_username = proxy_settings.username
         # Encrypt password with token as the secret
-        token = self.get_first_token(session)
+        token = self.get_first_token(session, cached=False)
         if token is None:
             raise MissingToken("Your token has been revoked,"
                         " please update your password to acquire a new one.")
@@ -241,16 +353,26 @@ class Controller(object):
 
         session.commit()
         log.debug("Proxy settings successfully updated: %r", proxy_settings)
-        self.invalidate_client_cache()
+        self.invalidate_client_cache(session=session)
 
-    def refresh_proxies(self, proxy_settings=None, device_config=None):
+    def refresh_proxies(self, proxy_settings=None, device_config=None,
+                        session=None):
         """Refresh current proxies with the given settings"""
         # If no proxy settings passed fetch them from database
         proxy_settings = (proxy_settings if proxy_settings is not None
                           else self.get_proxy_settings(
-                                                device_config=device_config))
+                                                device_config=device_config,
+                                                session=session))
+        # Only rebuild the proxies if the settings have changed
+        key = (proxy_settings.config, proxy_settings.proxy_type,
+               proxy_settings.server, proxy_settings.port,
+               proxy_settings.authenticated, proxy_settings.username,
+               proxy_settings.password, proxy_settings.exceptions)
+        if key == self._proxy_settings_key:
+            return
         self.proxies, self.proxy_exceptions = get_proxies_for_handler(
                                                             proxy_settings)
+        self._proxy_settings_key = key
 
     def get_server_binding(self, local_folder, raise_if_missing=False,
                            session=None):
@@ -273,15 +395,27 @@ class Controller(object):
             session = self.get_session()
         return session.query(ServerBinding).all()
 
-    def get_first_token(self, session=None):
-        """Get the token from the first server binding"""
+    def get_first_token(self, session=None, cached=True):
+        """Get the token from the first server binding
+
+        The token is cached until invalidate_token_cache is called. A missing
+        token is not cached: the server might be bound by another process.
+        Use cached=False to check the token against the database, e.g. before
+        encrypting data with it: the server might have been rebound or unbound
+        by another process.
+        """
+        if cached and self._first_token is not None:
+            return self._first_token
         if session is None:
             session = self.get_session()
         server_bindings = self.list_server_bindings(session)
-        if not server_bindings:
-            return None
-        sb = server_bindings[0]
-        return sb.remote_token
+        token = server_bindings[0].remote_token if server_bindings else None
+        self._first_token = token
+        return token
+
+    def invalidate_token_cache(self):
+        """Force the next get_first_token call to query the database"""
+        self._first_token = None
 
     def get_server_binding_settings(self):
         """Fetch server binding settings from database"""
@@ -315,7 +449,9 @@ class Controller(object):
             # process
             log.info("Telling synchronization process %d to stop." % pid)
             stop_file = os.path.join(self.config_folder, "stop_%d" % pid)
-            open(safe_long_path(stop_file), 'wb').close()
+            fd = os.open(safe_long_path(stop_file),
+                         os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0644)
+            os.close(fd)
         else:
             log.info("No running synchronization process to stop.")
 
@@ -342,78 +478,154 @@ class Controller(object):
         except NoResultFound:
             return []
 
-        states = self._pair_states_recursive(session, folder_state)
-
         return [(os.path.basename(s.local_path), pair_state)
-                for s, pair_state in states
+                for s, pair_state in self._children_pair_states(
+                    session, folder_state)
                 if s.local_parent_path == path]
 
-    def _pair_states_recursive(self, session, doc_pair):
-        """Recursive call to collect pair state under a given location."""
+    def _children_pair_states(self, session, doc_pair):
+        """Collect the summary pair state of the direct children of a folder
+
+        The descendants of each child folder are only walked until a non
+        synchronized one is found.
+        """
         if not doc_pair.folderish:
-            return [(doc_pair, doc_pair.pair_state)]
-
-        if doc_pair.local_path is not None and doc_pair.remote_ref is not None:
-            f = or_(
-                LastKnownState.local_parent_path == doc_pair.local_path,
-                LastKnownState.remote_parent_ref == doc_pair.remote_ref,
-            )
-        elif doc_pair.local_path is not None:
-            f = LastKnownState.local_parent_path == doc_pair.local_path
-        elif doc_pair.remote_ref is not None:
-            f = LastKnownState.remote_parent_ref == doc_pair.remote_ref
-        else:
+            return []
+        get_children = self._get_tree_children_getter(session, doc_pair)
+        results = []
+        for child in get_children(doc_pair):
+            pair_state = child.pair_state
+            if (child.folderish
+                and self._has_unsynchronized_descendant(child, get_children)):
+                pair_state = 'children_modified'
+            results.append((child, pair_state))
+        return results
+
+    def _has_unsynchronized_descendant(self, doc_pair, get_children):
+        """Stop walking the tree on the first non synchronized descendant"""
+        visited = set([doc_pair.id])
+        stack = [doc_pair]
+        while stack:
+            for child in get_children(stack.pop()):
+                if child.id in visited:
+                    continue
+                visited.add(child.id)
+                if child.pair_state != 'synchronized':
+                    return True
+                if child.folderish:
+                    stack.append(child)
+        return False
+
+    def _get_tree_children_getter(self, session, doc_pair):
+        """Load the tree under a folder and return a children lookup function
+
+        All the candidate descendants are fetched with a single query and the
+        returned function lists the children of a pair, ordered by name.
+        """
+        # Path prefix bounds: '0' is the character following '/'
+        local_min, local_max, remote_min, remote_max = None, None, None, None
+        if doc_pair.local_path is not None:
+            local_min = doc_pair.local_path.rstrip(u'/') + u'/'
+            local_max = local_min[:-1] + u'0'
+        if doc_pair.remote_ref is not None:
+            remote_min = u'%s/%s' % (doc_pair.remote_parent_path or u'',
+                                     doc_pair.remote_ref)
+            remote_max = remote_min + u'0'
+        if local_min is None and remote_min is None:
             raise ValueError("Illegal state %r: at least path or remote_ref"
                              " should be not None." % doc_pair)
 
-        children_states = session.query(LastKnownState).filter_by(
-            local_folder=doc_pair.local_folder).filter(f).order_by(
-                asc(LastKnownState.local_name),
-                asc(LastKnownState.remote_name),
-            ).all()
-
-        results = []
-        for child_state in children_states:
-            sub_results = self._pair_states_recursive(session, child_state)
-            results.extend(sub_results)
-
-        # A folder stays synchronized (or unknown) only if all the descendants
-        # are themselfves synchronized.
-        pair_state = doc_pair.pair_state
-        for _, sub_pair_state in results:
-            if sub_pair_state != 'synchronized':
-                pair_state = 'children_modified'
-            break
-        # Pre-pend the folder state to the descendants
-        return [(doc_pair, pair_state)] + results
+        # Plain SQL rows are enough to walk the tree: bypass the ORM but
+        # flush pending changes as an ORM query would do.
+        # The remote bounds can match more rows than the actual descendants
+        # (e.g. siblings whose ref starts with the same characters): this is
+        # harmless as only the states reachable from doc_pair through parent
+        # links are ever visited.
+        # The remote branch relies on the remote parent paths of the
+        # descendants being updated when a folder is moved, see
+        # Synchronizer._update_remote_parent_path_recursive.
+        if session.autoflush:
+            session.flush()
+        candidates = session.execute(_TREE_STATES_QUERY, dict(
+            local_folder=doc_pair.local_folder,
+            local_min=local_min, local_max=local_max,
+            remote_min=remote_min, remote_max=remote_max))
+        by_local_parent = defaultdict(list)
+        by_remote_parent = defaultdict(list)
+        seen = set()
+        for candidate in candidates:
+            # States matched by both branches are returned twice
+            if candidate.id in seen:
+                continue
+            seen.add(candidate.id)
+            if candidate.local_parent_path is not None:
+                by_local_parent[candidate.local_parent_path].append(candidate)
+            if candidate.remote_parent_ref is not None:
+                by_remote_parent[candidate.remote_parent_ref].append(candidate)
+
+        def get_children(pair):
+            children = dict()
+            if pair.local_path is not None:
+                for child in by_local_parent.get(pair.local_path, ()):
+                    children[child.id] = child
+            if pair.remote_ref is not None:
+                for child in by_remote_parent.get(pair.remote_ref, ()):
+                    children[child.id] = child
+            return sorted(children.values(),
+                          key=lambda c: (c.local_name, c.remote_name))
+
+        return get_children
 
     def _binding_path(self, local_path, session=None):
         """Find a server binding and relative path for a given FS path"""
         local_path = normalized_path(local_path)
+        if session is None:
+            session = self.get_session()
 
-        # Check exact binding match
-        binding = self.get_server_binding(local_path, session=session,
-            raise_if_missing=False)
-        if binding is not None:
-            return binding, u'/'
-
-        # Check for bindings that are prefix of local_path
-        session = self.get_session()
-        all_bindings = session.query(ServerBinding).all()
-        matching_bindings = [sb for sb in all_bindings
-                             if local_path.startswith(
-                                sb.local_folder + os.path.sep)]
-        if len(matching_bindings) == 0:
+        binding = self._find_binding(local_path, session)
+        if binding is None:
+            # Bindings might have been updated by another process
+            self._binding_folders = None
+            binding = self._find_binding(local_path, session)
+        if binding is None:
             raise NotFound("Could not find any server binding for "
                                + local_path)
-        elif len(matching_bindings) > 1:
-            raise RuntimeError("Found more than one binding for %s: %r" % (
-                local_path, matching_bindings))
-        binding = matching_bindings[0]
         path = local_path[len(binding.local_folder):]
+        if not path:
+            # Exact binding match
+            return binding, u'/'
         path = path.replace(os.path.sep, u'/')
         return binding, path
 
+    def _find_binding(self, local_path, session):
+        """Return the server binding containing local_path or None"""
+        binding_folder = self._find_binding_folder(local_path, session)
+        if binding_folder is None:
+            return None
+        return session.query(ServerBinding).get(binding_folder)
+
+    def _find_binding_folder(self, local_path, session):
+        """Return the bound local folder containing local_path or None"""
+        binding_folders = self._binding_folders
+        if binding_folders is None:
+            binding_folders = [folder for folder, in session.query(
+                ServerBinding.local_folder).all()]
+            self._binding_folders = binding_folders
+
+        # Check exact binding match
+        if local_path in binding_folders:
+            return local_path
+
+        # Check for bindings that are prefix of local_path
+        matching_folders = [folder for folder in binding_folders
+                            if local_path.startswith(folder + os.path.sep)]
+        if len(matching_folders) == 0:
+            return None
+        elif len(matching_folders) > 1:
+            raise RuntimeError("Found more than one binding for %s: %r" % (
+                local_path, matching_folders))
+        return matching_folders[0]
+
     def bind_server(self, local_folder, server_url, username, password):
         """Bind a local folder to a remote nuxeo server"""
         session = self.get_session()
@@ -484,6 +696,8 @@ class Controller(object):
             session.add(state)
 
         session.commit()
+        self.invalidate_token_cache()
+        self._binding_folders = None
         return server_binding
 
     def unbind_server(self, local_folder):
@@ -496,35 +710,16 @@ class Controller(object):
                                           session=session)
 
         # Revoke token if necessary
-        if binding.remote_token is not None:
-            try:
-                nxclient = self.remote_doc_client_factory(
-                        binding.server_url,
-                        binding.remote_user,
-                        self.device_id,
-                        self.version,
-                        proxies=self.proxies,
-                        proxy_exceptions=self.proxy_exceptions,
-                        token=binding.remote_token,
-                        timeout=self.timeout)
-                log.info("Revoking token for '%s' with account '%s'",
-                         binding.server_url, binding.remote_user)
-                nxclient.revoke_token()
-            except POSSIBLE_NETWORK_ERROR_TYPES:
-                log.warning("Could not connect to server '%s' to revoke token",
-                            binding.server_url)
-            except Unauthorized:
-                # Token is already revoked
-                pass
+        self._revoke_token(binding)
 
         # Invalidate client cache
-        self.invalidate_client_cache(binding.server_url)
+        self.invalidate_client_cache(binding.server_url, session=session)
 
         # Delete binding info in local DB
-        log.info("Unbinding '%s' from '%s' with account '%s'",
-                 local_folder, binding.server_url, binding.remote_user)
-        session.delete(binding)
+        self._delete_binding(session, binding)
         session.commit()
+        self.invalidate_token_cache()
+        self._binding_folders = None
 
     def unbind_all(self):
         """Unbind all server and revoke all tokens
@@ -532,8 +727,51 @@ class Controller(object):
         This is useful for cleanup in integration test code.
         """
         session = self.get_session()
-        for sb in session.query(ServerBinding).all():
-            self.unbind_server(sb.local_folder)
+        bindings = session.query(ServerBinding).all()
+        if not bindings:
+            return
+        for sb in bindings:
+            self._revoke_token(sb)
+
+        # Invalidate client cache for all servers at once
+        self.invalidate_client_cache(session=session)
+
+        # Delete all bindings info in local DB in a single transaction
+        for sb in bindings:
+            self._delete_binding(session, sb)
+        session.commit()
+        self.invalidate_token_cache()
+        self._binding_folders = None
+
+    def _revoke_token(self, binding):
+        """Revoke the token of a server binding if any"""
+        if binding.remote_token is None:
+            return
+        try:
+            nxclient = self.remote_doc_client_factory(
+                    binding.server_url,
+                    binding.remote_user,
+                    self.device_id,
+                    self.version,
+                    proxies=self.proxies,
+                    proxy_exceptions=self.proxy_exceptions,
+                    token=binding.remote_token,
+                    timeout=self.timeout)
+            log.info("Revoking token for '%s' with account '%s'",
+                     binding.server_url, binding.remote_user)
+            nxclient.revoke_token()
+        except POSSIBLE_NETWORK_ERROR_TYPES:
+            log.warning("Could not connect to server '%s' to revoke token",
+                        binding.server_url)
+        except Unauthorized:
+            # Token is already revoked
+            pass
+
+    def _delete_binding(self, session, binding):
+        """Delete binding info (and its states) in local DB without commit"""
+        log.info("Unbinding '%s' from '%s' with account '%s'",
+                 binding.local_folder, binding.server_url, binding.remote_user)
+        session.delete(binding)
 
     def bind_root(self, local_folder, remote_ref, repository='default',
                   session=None):
@@ -579,6 +817,27 @@ class Controller(object):
         If ingore_in_error is not None and is a duration in second, skip pair
         states that have recently triggered a synchronization error.
         """
+        return self._pending_query(local_folder=local_folder,
+                                   ignore_in_error=ignore_in_error,
+                                   session=session).limit(limit).all()
+
+    def count_pending(self, limit=100, local_folder=None, session=None):
+        """Count pending files to synchronize, up to limit
+
+        Only the ids are fetched: no LastKnownState instance is built.
+        """
+        query = self._pending_query(local_folder=local_folder,
+                                    session=session)
+        return len(query.with_entities(LastKnownState.id).limit(limit).all())
+
+    def next_pending(self, local_folder=None, session=None):
+        """Return the next pending file to synchronize or None"""
+        return self._pending_query(local_folder=local_folder,
+                                   session=session).first()
+
+    def _pending_query(self, local_folder=None, ignore_in_error=None,
+                       session=None):
+        """Build the ordered query of pending pair states"""
         if session is None:
             session = self.get_session()
 
@@ -608,13 +867,7 @@ class Controller(object):
             # Ensure that newly created local folders will be synchronized
             # before their children
             asc(LastKnownState.local_path)
-        ).limit(limit).all()
-
-    def next_pending(self, local_folder=None, session=None):
-        """Return the next pending file to synchronize or None"""
-        pending = self.list_pending(limit=1, local_folder=local_folder,
-                                    session=session)
-        return pending[0] if len(pending) > 0 else None
+        )
 
     def _get_client_cache(self):
         if not hasattr(self._local, 'remote_clients'):
@@ -626,23 +879,23 @@ class Controller(object):
         cache = self._get_client_cache()
         sb = server_binding
         cache_key = (sb.server_url, sb.remote_user, self.device_id)
+        # Register the key so that invalidate_client_cache can bump it
+        invalidation_timestamp = self._client_cache_timestamps.setdefault(
+            cache_key, 0)
         remote_client_cache = cache.get(cache_key)
-        if remote_client_cache is not None:
+        if (remote_client_cache is not None
+            and remote_client_cache[1] >= invalidation_timestamp):
             remote_client = remote_client_cache[0]
-            timestamp = remote_client_cache[1]
-        client_cache_timestamp = self._client_cache_timestamps.get(cache_key)
-
-        if remote_client_cache is None or timestamp < client_cache_timestamp:
+        else:
             remote_client = self.remote_fs_client_factory(
                 sb.server_url, sb.remote_user, self.device_id,
                 self.version,
                 proxies=self.proxies, proxy_exceptions=self.proxy_exceptions,
                 password=sb.remote_password, token=sb.remote_token,
                 timeout=self.timeout, cookie_jar=self.cookie_jar)
-            if client_cache_timestamp is None:
-                client_cache_timestamp = 0
-                self._client_cache_timestamps[cache_key] = 0
-            cache[cache_key] = remote_client, client_cache_timestamp
+            # Store the invalidation timestamp read before building the
+            # client: an invalidation happening meanwhile forces a rebuild
+            cache[cache_key] = remote_client, invalidation_timestamp
         # Make it possible to have the remote client simulate any kind of
         # failure: this is useful for ensuring that cookies used for load
         # balancer affinity (e.g. AWSELB) are shared by all the automation
@@ -661,27 +914,25 @@ class Controller(object):
             repository=repository, base_folder=base_folder,
             timeout=self.timeout, cookie_jar=self.cookie_jar)
 
-    def invalidate_client_cache(self, server_url=None):
-        for key in self._client_cache_timestamps:
-            if server_url is None or key[0] == server_url:
-                now = datetime.utcnow().utctimetuple()
-                self._client_cache_timestamps[key] = calendar.timegm(now)
+    def invalidate_client_cache(self, server_url=None, session=None):
+        if self._client_cache_timestamps:
+            now = time()
+            for key in self._client_cache_timestamps:
+                if server_url is None or key[0] == server_url:
+                    self._client_cache_timestamps[key] = now
         # Re-fetch HTTP proxy settings
-        self.refresh_proxies()
+        self.refresh_proxies(session=session)
 
     def get_state(self, server_url, remote_ref):
         """Find a pair state for the provided remote document identifiers."""
         server_url = self._normalize_url(server_url)
         session = self.get_session()
-        try:
-            states = session.query(LastKnownState).filter_by(
-                remote_ref=remote_ref,
-            ).all()
-            for state in states:
-                if (state.server_binding.server_url == server_url):
-                    return state
-        except NoResultFound:
-            return None
+        # Join the server binding instead of lazy loading it for each state
+        return session.query(LastKnownState).join(
+            LastKnownState.server_binding).filter(
+                LastKnownState.remote_ref == remote_ref,
+                ServerBinding.server_url == server_url,
+            ).first()
 
     def get_state_for_local_path(self, local_os_path):
         """Find a DB state from a local filesystem path"""
@@ -712,12 +963,16 @@ class Controller(object):
         if sys.platform == 'win32':
             os.startfile(file_path)
         elif sys.platform == 'darwin':
-            subprocess.Popen(['open', file_path])
+            subprocess.Popen([find_launcher('open') or 'open', file_path])
         else:
+            # xdg-open should be supported by recent Gnome, KDE, Xfce
+            launcher = find_launcher('xdg-open')
+            if launcher is None:
+                log.error("Failed to find and editor for: '%s'", file_path)
+                return
             try:
-                subprocess.Popen(['xdg-open', file_path])
+                subprocess.Popen([launcher, file_path])
             except OSError:
-                # xdg-open should be supported by recent Gnome, KDE, Xfce
                 log.error("Failed to find and editor for: '%s'", file_path)
 
     def make_remote_raise(self, error):
@@ -726,16 +981,17 @@ class Controller(object):
 
     def dispose(self):
         """Release all database resources"""
-        self.get_session().close_all()
-        self._engine.pool.dispose()
+        # close_all is a class level method: no need to build a session for
+        # the current thread to call it
+        self._session_maker.close_all()
+        self._session_maker.remove()
+        self._engine.dispose()
 
     def _normalize_url(self, url):
         """Ensure that user provided url always has a trailing '/'"""
-        if url is None or not url:
+        if not url:
             raise ValueError("Invalid url: %r" % url)
-        if not url.endswith(u'/'):
-            return url + u'/'
-        return url
+        return url if url[-1] == u'/' else url + u'/'
 
     def register_folder_link(self, folder_path):
         if sys.platform == 'darwin':
@@ -748,7 +1004,7 @@ class Controller(object):
             from LaunchServices import kLSSharedFileListFavoriteItems
             from LaunchServices import LSSharedFileListInsertItemURL
             from LaunchServices import kLSSharedFileListItemBeforeFirst
-            from LaunchServices import CFURLCreateWithString
+            from LaunchServices import CFURLCreateFromFileSystemRepresentation
         except ImportError:
             log.warning("PyObjC package is not installed:"
                         " skipping favorite link creation")
@@ -756,13 +1012,21 @@ class Controller(object):
         folder_path = normalized_path(folder_path)
         folder_name = os.path.basename(folder_path)
 
-        lst = LSSharedFileListCreate(None, kLSSharedFileListFavoriteItems,
-                                     None)
+        # The Finder favorite list is created once per controller
+        lst = self._finder_favorites
+        if lst is None:
+            lst = LSSharedFileListCreate(None, kLSSharedFileListFavoriteItems,
+                                         None)
+            self._finder_favorites = lst
         if lst is None:
             log.warning("Could not fetch the Finder favorite list.")
             return
 
-        url = CFURLCreateWithString(None, "file://" + quote(folder_path), None)
+        encoded_path = folder_path
+        if isinstance(encoded_path, unicode):
+            encoded_path = encoded_path.encode('utf-8')
+        url = CFURLCreateFromFileSystemRepresentation(
+            None, encoded_path, len(encoded_path), True)
         if url is None:
             log.warning("Could not generate valid favorite URL for: %s",
                 folder_path)
@@ -5,7 +5,7 @@ import time
 from threading import Thread
 from nxdrive.protocol_handler import parse_protocol_url
 from nxdrive.logging_config import get_logger
-from nxdrive.gui.resources import find_icon
+from nxdrive.gui.resources import find_qicon
 from nxdrive.gui.settings import prompt_settings
 
 log = get_logger(__name__)
@@ -138,9 +138,9 @@ class Application(QApplication):
             self.icon_spin_timer.start(150)
         else:
             self.icon_spin_timer.stop()
-            icon = find_icon('nuxeo_drive_systray_icon_%s_18.png' % state)
+            icon = find_qicon('nuxeo_drive_systray_icon_%s_18.png' % state)
             if icon is not None:
-                self._tray_icon.setIcon(QtGui.QIcon(icon))
+                self._tray_icon.setIcon(icon)
             else:
                 log.warning('Icon not found: %s', icon)
         self._icon_state = state
@@ -151,9 +151,10 @@ class Application(QApplication):
         return getattr(self, '_icon_state', None)
 
     def spin_transferring_icon(self):
-        icon = find_icon('nuxeo_drive_systray_icon_transferring_%s.png'
-                         % (self.icon_spin_count + 1))
-        self._tray_icon.setIcon(QtGui.QIcon(icon))
+        icon = find_qicon('nuxeo_drive_systray_icon_transferring_%s.png'
+                          % (self.icon_spin_count + 1))
+        if icon is not None:
+            self._tray_icon.setIcon(icon)
         self.icon_spin_count = (self.icon_spin_count + 1) % 10
 
     def action_quit(self):
@@ -298,6 +299,7 @@ class Application(QApplication):
         sb = self.controller.get_server_binding(str(local_folder))
         sb.invalidate_credentials()
         self.controller.get_session().commit()
+        self.controller.invalidate_token_cache()
         self.communicator.menu.emit()
 
     @QtCore.pyqtSlot()
@@ -533,3 +535,6 @@ def sync_loop(controller, **kwargs):
         controller.synchronizer.loop(**kwargs)
     except Exception, e:
         log.error("Error in synchronization thread: %s", e, exc_info=True)
+    finally:
+        # Release the session bound to the synchronization thread
+        controller.remove_session()
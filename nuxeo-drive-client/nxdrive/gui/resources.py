@@ -6,6 +6,9 @@ from nxdrive.logging_config import get_logger
 
 log = get_logger(__name__)
 
+# QIcon instances by icon filename, to decode each image file only once
+_qicons = dict()
+
 
 def find_icon(icon_filename):
     """Find the FS path of an icon on various OS binary packages"""
@@ -35,3 +38,15 @@ def find_icon(icon_filename):
         return None
 
     return icon_filepath
+
+
+def find_qicon(icon_filename):
+    """Return a shared QIcon for the icon file, None if it cannot be found"""
+    qicon = _qicons.get(icon_filename)
+    if qicon is None:
+        icon_filepath = find_icon(icon_filename)
+        if icon_filepath is None:
+            return None
+        from PyQt4 import QtGui
+        qicon = _qicons[icon_filename] = QtGui.QIcon(icon_filepath)
+    return qicon
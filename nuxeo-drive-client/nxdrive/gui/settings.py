@@ -1,6 +1,6 @@
 """GUI prompt to manage settings"""
 from nxdrive.client import Unauthorized
-from nxdrive.gui.resources import find_icon
+from nxdrive.gui.resources import find_qicon
 from nxdrive.logging_config import get_logger
 from nxdrive.controller import ServerBindingSettings
 from nxdrive.controller import ProxySettings
@@ -53,9 +53,9 @@ class Dialog(QDialog):
             raise RuntimeError("PyQt4 is not installed.")
         if title is not None:
             self.setWindowTitle(title)
-        icon = find_icon('nuxeo_drive_icon_64.png')
+        icon = find_qicon('nuxeo_drive_icon_64.png')
         if icon is not None:
-            self.setWindowIcon(QtGui.QIcon(icon))
+            self.setWindowIcon(icon)
         self.resize(500, -1)
         self.accepted = False
         self.callback = callback
@@ -63,6 +63,10 @@ class Dialog(QDialog):
         # Fields
         self.sb_fields = {}
         self.proxy_fields = {}
+        # Proxy fields enabled by the manual config, the credential ones
+        # also depending on the authentication checkbox
+        self.manual_proxy_fields = []
+        self.credential_proxy_fields = []
 
         # Style sheet
         self.setStyleSheet('QGroupBox {border: none;}')
@@ -78,6 +82,7 @@ class Dialog(QDialog):
 
         # Message
         self.message_area = QtGui.QLabel()
+        self.message_shown = False
         self.message_area.setWordWrap(True)
 
         # Buttons
@@ -95,8 +100,8 @@ class Dialog(QDialog):
     def get_account_box(self, field_spec):
         box = QtGui.QGroupBox()
         box.setFixedHeight(200)
-        layout = QtGui.QGridLayout()
-        for i, spec in enumerate(field_spec):
+        layout = QtGui.QFormLayout()
+        for spec in field_spec:
             field_id = spec['id']
             value = spec.get('value')
             if field_id == 'update_password':
@@ -104,10 +109,9 @@ class Dialog(QDialog):
                     field = QtGui.QCheckBox(spec['label'])
                     # Set listener to enable / disable password field
                     field.stateChanged.connect(self.enable_password)
-                    layout.addWidget(field, i + 1, 1)
+                    layout.addRow('', field)
                     self.sb_fields[field_id] = field
             else:
-                label = QtGui.QLabel(spec['label'])
                 line_edit = QtGui.QLineEdit()
                 if value is not None:
                     line_edit.setText(str(value))
@@ -115,10 +119,9 @@ class Dialog(QDialog):
                     line_edit.setEchoMode(QtGui.QLineEdit.Password)
                 enabled = spec.get('enabled', True)
                 line_edit.setEnabled(enabled)
-                line_edit.textChanged.connect(self.clear_message)
+                line_edit.textEdited.connect(self.clear_message)
                 if field_id != 'initialized':
-                    layout.addWidget(label, i + 1, 0)
-                    layout.addWidget(line_edit, i + 1, 1)
+                    layout.addRow(spec['label'], line_edit)
                 self.sb_fields[field_id] = line_edit
         box.setLayout(layout)
         return box
@@ -128,14 +131,18 @@ class Dialog(QDialog):
         self.sb_fields['password'].setEnabled(enabled)
 
     def clear_message(self, *args, **kwargs):
-        self.message_area.clear()
+        # Called on each keystroke: only reach Qt when there is something
+        # to clear
+        if self.message_shown:
+            self.message_area.clear()
+            self.message_shown = False
 
     def get_proxy_box(self, field_spec):
         box = QtGui.QGroupBox()
-        layout = QtGui.QGridLayout()
-        for i, spec in enumerate(field_spec):
+        layout = QtGui.QFormLayout()
+        layout.setLabelAlignment(QtCore.Qt.AlignRight)
+        for spec in field_spec:
             field_id = spec['id']
-            label = QtGui.QLabel(spec['label'])
             value = spec.get('value')
             items = spec.get('items')
             # Combo box
@@ -174,30 +181,34 @@ class Dialog(QDialog):
             width = spec.get('width', DEFAULT_FIELD_WIDGET_WIDTH)
             field.setFixedWidth(width)
             if field_id != 'proxy_authenticated':
-                layout.addWidget(label, i + 1, 0, QtCore.Qt.AlignRight)
-            layout.addWidget(field, i + 1, 1)
+                layout.addRow(spec['label'], field)
+            else:
+                layout.addRow('', field)
             self.proxy_fields[field_id] = field
+            if field_id in ('proxy_username', 'proxy_password'):
+                self.credential_proxy_fields.append(field)
+            elif field_id != 'proxy_config':
+                self.manual_proxy_fields.append(field)
         box.setLayout(layout)
         return box
 
     def enable_manual_settings(self):
         enabled = self.sender().currentText() == 'Manual'
-        for field in self.proxy_fields:
-            if field in ('proxy_username', 'proxy_password'):
-                authenticated = (self.proxy_fields['proxy_authenticated']
-                                 .isChecked())
-                self.proxy_fields[field].setEnabled(enabled and authenticated)
-            elif field != 'proxy_config':
-                self.proxy_fields[field].setEnabled(enabled)
+        authenticated = self.proxy_fields['proxy_authenticated'].isChecked()
+        for field in self.manual_proxy_fields:
+            field.setEnabled(enabled)
+        for field in self.credential_proxy_fields:
+            field.setEnabled(enabled and authenticated)
 
     def enable_credentials(self):
         enabled = self.sender().isChecked()
-        self.proxy_fields['proxy_username'].setEnabled(enabled)
-        self.proxy_fields['proxy_password'].setEnabled(enabled)
+        for field in self.credential_proxy_fields:
+            field.setEnabled(enabled)
 
     def show_message(self, message, tab_index=0):
         self.tabs.setCurrentIndex(tab_index)
         self.message_area.setText(message)
+        self.message_shown = True
 
     def get_about_box(self, version_number):
         box = QtGui.QGroupBox()
@@ -247,14 +258,15 @@ class Dialog(QDialog):
 
     def read_field_values(self, fields, values):
         for id_, widget in fields.items():
+            # Convert QString values to str once for all
             if isinstance(widget, QtGui.QComboBox):
-                value = widget.currentText()
+                value = str(widget.currentText())
             elif isinstance(widget, QtGui.QCheckBox):
                 value = widget.isChecked()
             elif isinstance(widget, QtGui.QTextEdit):
-                value = widget.toPlainText()
+                value = str(widget.toPlainText())
             else:
-                value = widget.text()
+                value = str(widget.text())
             values[id_] = value
 
     def reject(self):
@@ -415,14 +427,14 @@ def prompt_settings(controller, sb_settings, proxy_settings, version,
             return handle_error(msg, dialog, tab_index=1, debug=True)
 
     def get_proxy_settings(values):
-        return ProxySettings(config=str(values['proxy_config']),
-                             proxy_type=str(values['proxy_type']),
-                             server=str(values['proxy_server']),
-                             port=str(values['proxy_port']),
+        return ProxySettings(config=values['proxy_config'],
+                             proxy_type=values['proxy_type'],
+                             server=values['proxy_server'],
+                             port=values['proxy_port'],
                              authenticated=values['proxy_authenticated'],
-                             username=str(values['proxy_username']),
-                             password=str(values['proxy_password']),
-                             exceptions=str(values['proxy_exceptions']))
+                             username=values['proxy_username'],
+                             password=values['proxy_password'],
+                             exceptions=values['proxy_exceptions'])
 
     def bind_server(values, proxy_settings, dialog):
         initialized = values.get('initialized')
@@ -433,7 +445,6 @@ def prompt_settings(controller, sb_settings, proxy_settings, version,
         if not url:
             dialog.show_message("The Nuxeo server URL is required.")
             return False
-        url = str(url)
         if (not url.startswith("http://")
             and not url.startswith('https://')):
             dialog.show_message("Not a valid HTTP url.")
@@ -442,8 +453,7 @@ def prompt_settings(controller, sb_settings, proxy_settings, version,
         if not username:
             dialog.show_message("A user name is required")
             return False
-        username = str(username)
-        password = str(values['password'])
+        password = values['password']
         dialog.show_message("Connecting to %s ..." % url)
         try:
             controller.refresh_proxies(proxy_settings)
@@ -468,16 +478,19 @@ def prompt_settings(controller, sb_settings, proxy_settings, version,
         dialog.show_message(msg, tab_index=tab_index)
         return False
 
+    if app is None:
+        app = QtGui.QApplication.instance()
     if app is None:
         log.debug("Launching Qt prompt to manage settings.")
-        QtGui.QApplication([])
+        # Keep a reference for the lifetime of the dialog
+        app = QtGui.QApplication([])
     dialog = Dialog(sb_field_spec, proxy_field_spec, version,
                     title="Nuxeo Drive - Settings",
                     callback=validate)
     is_dialog_open = True
     try:
         dialog.exec_()
-    except:
+    except Exception:
         dialog.reject()
         raise
     finally:
@@ -1,8 +1,11 @@
 """Utilities to log nxdrive operations and failures"""
 
+import errno
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import threading
+import time
 
 
 TRACE = 5
@@ -18,6 +21,109 @@ logging.TRACE = TRACE
 _logging_context = dict()
 
 
+class TimeCachingFormatter(logging.Formatter):
+    """Formatter that only calls strftime once per second of log records"""
+
+    _cached_time = (None, None)
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt is not None:
+            return logging.Formatter.formatTime(self, record, datefmt)
+        second = int(record.created)
+        cached_second, cached_str = self._cached_time
+        if second != cached_second:
+            cached_str = time.strftime("%Y-%m-%d %H:%M:%S",
+                                       self.converter(second))
+            # assign a single tuple so that concurrent threads always see
+            # a consistent pair
+            self._cached_time = (second, cached_str)
+        return "%s,%03d" % (cached_str, record.msecs)
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that does not flush the file on each record
+
+    The stream is flushed on warnings and errors, and at most once per
+    flush_interval seconds otherwise: a timer flushes the records left in
+    the buffer when no other record follows them.
+    """
+
+    flush_interval = 1.0
+
+    _delay_flush = False
+
+    _last_flush = 0
+
+    # (pid, timer) of the pending flush timer if any: the threads of a
+    # parent process do not exist in a forked child, see also
+    # close_log_files
+    _flush_timer = None
+
+    def _open(self):
+        stream = RotatingFileHandler._open(self)
+        # Position the stream once so that shouldRollover can rely on tell
+        stream.seek(0, 2)
+        return stream
+
+    def shouldRollover(self, record):
+        # Same as RotatingFileHandler.shouldRollover without seeking to the
+        # end of the file for each record, which would flush the stream
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0:
+            msg = "%s\n" % self.format(record)
+            if self.stream.tell() + len(msg) >= self.maxBytes:
+                return 1
+        return 0
+
+    def emit(self, record):
+        # Called with the handler lock held
+        self._delay_flush = (
+            record.levelno < logging.WARNING
+            and time.time() - self._last_flush < self.flush_interval)
+        try:
+            RotatingFileHandler.emit(self, record)
+            if self._delay_flush:
+                self._schedule_flush()
+        finally:
+            self._delay_flush = False
+
+    def _schedule_flush(self):
+        # Called with the handler lock held
+        pid = os.getpid()
+        if self._flush_timer is not None and self._flush_timer[0] == pid:
+            # Already scheduled in this process
+            return
+        timer = threading.Timer(self.flush_interval, self._timed_flush)
+        timer.daemon = True
+        self._flush_timer = (pid, timer)
+        timer.start()
+
+    def _timed_flush(self):
+        self.acquire()
+        try:
+            self._flush_timer = None
+            self.flush()
+        finally:
+            self.release()
+
+    def flush(self):
+        if self._delay_flush:
+            return
+        self._last_flush = time.time()
+        RotatingFileHandler.flush(self)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self._flush_timer is not None:
+                self._flush_timer[1].cancel()
+                self._flush_timer = None
+        finally:
+            self.release()
+        RotatingFileHandler.close(self)
+
+
 def configure(log_filename, file_level='INFO', console_level='INFO',
               command_name=None, log_rotate_keep=3,
               log_rotate_max_bytes=100000000):
@@ -38,12 +144,17 @@ def configure(log_filename, file_level='INFO', console_level='INFO',
     # define a Handler for file based log with rotation
     log_filename = os.path.expanduser(log_filename)
     log_folder = os.path.dirname(log_filename)
-    if not os.path.exists(log_folder):
-        os.makedirs(log_folder)
-
-    file_handler = RotatingFileHandler(
+    if log_folder:
+        try:
+            os.makedirs(log_folder)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    # delay opening the log file until the first record is emitted
+    file_handler = BufferedRotatingFileHandler(
         log_filename, mode='a', maxBytes=log_rotate_max_bytes,
-        backupCount=log_rotate_keep)
+        backupCount=log_rotate_keep, delay=True)
     file_handler.setLevel(file_level)
 
     # define a Handler which writes INFO messages or higher to the sys.stderr
@@ -51,7 +162,7 @@ def configure(log_filename, file_level='INFO', console_level='INFO',
     console_handler.setLevel(console_level)
 
     # define the formatter
-    formatter = logging.Formatter(
+    formatter = TimeCachingFormatter(
         "%(asctime)s %(process)d %(thread)d %(levelname)-8s %(name)-18s"
         " %(message)s"
     )
@@ -65,8 +176,26 @@ def configure(log_filename, file_level='INFO', console_level='INFO',
     root_logger.addHandler(file_handler)
 
 
+def close_log_files():
+    """Flush and close the log files of the root logger
+
+    To be called before forking a daemon process: the records buffered by
+    the parent process are written and its flush timers are cancelled. The
+    files are reopened on the next emitted record.
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            handler.close()
+
+
 def get_logger(name):
     logger = logging.getLogger(name)
-    trace = lambda *args, **kwargs: logger.log(TRACE, *args, **kwargs)
+
+    def trace(msg, *args, **kwargs):
+        # Same as logger.log(TRACE, ...) without its level type checks, the
+        # level being filtered out most of the time
+        if logger.isEnabledFor(TRACE):
+            logger._log(TRACE, msg, args, **kwargs)
+
     setattr(logger, 'trace', trace)
     return logger
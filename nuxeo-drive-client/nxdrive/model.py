@@ -10,6 +10,7 @@ from sqlalchemy import Integer
 from sqlalchemy import Sequence
 from sqlalchemy import String
 from sqlalchemy import Boolean
+from sqlalchemy import Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import backref
 from sqlalchemy.ext.declarative import declarative_base
@@ -17,6 +18,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.pool import SingletonThreadPool
+from sqlalchemy.exc import OperationalError
 
 from nxdrive import __version__
 from nxdrive.client import LocalClient
@@ -171,7 +173,8 @@ class LastKnownState(Base):
     # can be None for the root it-self.
     local_parent_path = Column(String, index=True)
     remote_parent_ref = Column(String, index=True)
-    remote_parent_path = Column(String)  # for ordering only
+    # for ordering and subtree lookups by path prefix
+    remote_parent_path = Column(String)
 
     # Names for fast alignment queries
     local_name = Column(String, index=True)
@@ -488,6 +491,19 @@ class LastKnownState(Base):
         return os.path.join(self.local_folder, relative_path)
 
 
+# Composite indexes for the children lookups of the controller and of the
+# synchronizer, by local parent path or remote parent ref within a binding,
+# and for the descendants lookups by local path or remote parent path prefix.
+Index('ix_last_known_states_local_folder_path',
+      LastKnownState.local_folder, LastKnownState.local_path)
+Index('ix_last_known_states_local_parent',
+      LastKnownState.local_folder, LastKnownState.local_parent_path)
+Index('ix_last_known_states_remote_parent',
+      LastKnownState.local_folder, LastKnownState.remote_parent_ref)
+Index('ix_last_known_states_remote_parent_path',
+      LastKnownState.local_folder, LastKnownState.remote_parent_path)
+
+
 class FileEvent(Base):
     __tablename__ = 'fileevents'
 
@@ -526,7 +542,29 @@ def init_db(nxdrive_home, echo=False, scoped_sessions=True, poolclass=None):
 
     # Ensure that the tables are properly initialized
     Base.metadata.create_all(engine)
+    _create_missing_indexes(engine, LastKnownState.__table__)
     maker = sessionmaker(bind=engine)
     if scoped_sessions:
         maker = scoped_session(maker)
     return engine, maker
+
+
+def _create_missing_indexes(engine, table):
+    """Create the indexes added to an existing table by newer versions
+
+    create_all only creates the indexes of the tables it creates itself.
+    """
+    def get_index_names():
+        return set(row[1] for row in engine.execute(
+            "PRAGMA index_list(%s)" % table.name))
+
+    existing = get_index_names()
+    for index in table.indexes:
+        if index.name not in existing:
+            log.debug("Creating missing index %s", index.name)
+            try:
+                index.create(engine)
+            except OperationalError:
+                # Another process might have created it meanwhile
+                if index.name not in get_index_names():
+                    raise
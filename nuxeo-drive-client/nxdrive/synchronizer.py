@@ -295,8 +295,9 @@ class Synchronizer(object):
         local_children = session.query(LastKnownState).filter_by(
             local_folder=doc_pair.local_folder,
             remote_parent_ref=doc_pair.remote_ref).all()
+        # The children of doc_pair have its own path as parent path
+        child_path = updated_path + '/' + doc_pair.remote_ref
         for child in local_children:
-            child_path = updated_path + '/' + child.remote_ref
             self._update_remote_parent_path_recursive(session, child,
                 child_path)
 
@@ -1494,9 +1495,9 @@ class Synchronizer(object):
 
     def _notify_pending(self, server_binding):
         """Update the statistics of the frontend"""
-        n_pending = len(self._controller.list_pending(
+        n_pending = self._controller.count_pending(
                         local_folder=server_binding.local_folder,
-                        limit=self.limit_pending))
+                        limit=self.limit_pending)
 
         reached_limit = n_pending == self.limit_pending
         if self._frontend is not None:
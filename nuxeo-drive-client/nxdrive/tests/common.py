@@ -7,11 +7,51 @@ import shutil
 
 from nxdrive.utils import safe_long_path
 from nxdrive.model import LastKnownState
+from nxdrive.model import ServerBinding
 from nxdrive.client import RemoteDocumentClient
 from nxdrive.client import RemoteFileSystemClient
+from nxdrive.client.remote_file_system_client import RemoteFileInfo
 from nxdrive.controller import Controller
 
 
+TEST_LOCAL_FOLDER = u'/nxdrive-tests/Nuxeo Drive'
+TEST_SERVER_URL = u'http://localhost:8080/nuxeo/'
+
+
+def make_controller():
+    """Controller on a temporary home with a single server binding"""
+    ctl = Controller(tempfile.mkdtemp(u'-nxdrive-tests'))
+    session = ctl.get_session()
+    session.add(ServerBinding(TEST_LOCAL_FOLDER, TEST_SERVER_URL,
+                              u'Administrator'))
+    session.commit()
+    return ctl
+
+
+def dispose_controller(ctl):
+    ctl.dispose()
+    shutil.rmtree(ctl.config_folder)
+
+
+def add_pair_state(session, local_path, remote_ref, remote_parent_ref,
+                   remote_parent_path, folderish=True,
+                   pair_state='synchronized'):
+    """Store a pair state for a document named after its local path"""
+    name = local_path.rsplit(u'/', 1)[-1] or u'Nuxeo Drive'
+    remote_info = RemoteFileInfo(
+        name, remote_ref, remote_parent_ref,
+        remote_parent_path + u'/' + remote_ref, folderish, None, None, None,
+        None, True, True, True, True)
+    state = LastKnownState(TEST_LOCAL_FOLDER, remote_info=remote_info)
+    state.local_path = local_path
+    state.local_name = name
+    if local_path != u'/':
+        state.local_parent_path = local_path.rsplit(u'/', 1)[0] or u'/'
+    state.pair_state = pair_state
+    session.add(state)
+    return state
+
+
 class IntegrationTestCase(unittest.TestCase):
 
     TEST_WORKSPACE_PATH = (
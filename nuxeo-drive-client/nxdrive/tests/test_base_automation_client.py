@@ -0,0 +1,29 @@
+from cookielib import Cookie
+
+from nose.tools import assert_equals
+from nxdrive.client.base_automation_client import SyncCookieJar
+
+
+def make_cookie(domain, name, value):
+    return Cookie(0, name, value, None, False, domain, False, False, '/',
+                  False, False, None, False, None, None, {})
+
+
+def test_sync_cookie_jar():
+    cookie_jar = SyncCookieJar()
+    assert_equals(len(cookie_jar), 0)
+    assert_equals(list(cookie_jar), [])
+
+    cookie_jar.set_cookie(make_cookie('server1.com', 'JSESSIONID', 'a'))
+    cookie_jar.set_cookie(make_cookie('server2.com', 'JSESSIONID', 'b'))
+    assert_equals(len(cookie_jar), 2)
+    assert_equals([c.value for c in cookie_jar], ['a', 'b'])
+
+    # Iterating over a snapshot: cookies set by other clients meanwhile are
+    # not returned
+    values = []
+    for cookie in cookie_jar:
+        cookie_jar.set_cookie(make_cookie('server3.com', 'JSESSIONID', 'c'))
+        values.append(cookie.value)
+    assert_equals(values, ['a', 'b'])
+    assert_equals(len(cookie_jar), 3)
@@ -0,0 +1,141 @@
+from nose.tools import assert_equals
+from nose.tools import assert_raises
+from nose.tools import with_setup
+from nxdrive.client import NotFound
+from nxdrive.controller import ProxySettings
+from nxdrive.model import ServerBinding
+from nxdrive.tests.common import TEST_LOCAL_FOLDER
+from nxdrive.tests.common import TEST_SERVER_URL
+from nxdrive.tests.common import add_pair_state
+from nxdrive.tests.common import dispose_controller
+from nxdrive.tests.common import make_controller
+from nxdrive.utils import decrypt
+
+
+ctl = None
+
+
+def setup_controller():
+    global ctl
+    ctl = make_controller()
+
+
+def teardown_controller():
+    dispose_controller(ctl)
+
+
+def test_proxy_settings_parsed_exceptions():
+    proxy_settings = ProxySettings()
+    assert_equals(proxy_settings.parsed_exceptions, None)
+    proxy_settings.exceptions = u' '
+    assert_equals(proxy_settings.parsed_exceptions, None)
+
+    proxy_settings = ProxySettings(exceptions=u'localhost, 127.0.0.1,')
+    assert_equals(proxy_settings.parsed_exceptions,
+                  [u'localhost', u'127.0.0.1', u''])
+
+    # Parsed again when the exceptions are updated
+    proxy_settings.exceptions = u'nuxeo.com'
+    assert_equals(proxy_settings.parsed_exceptions, [u'nuxeo.com'])
+
+
+@with_setup(setup_controller, teardown_controller)
+def test_get_first_token():
+    session = ctl.get_session()
+    assert_equals(ctl.get_first_token(session), None)
+
+    # A missing token is not cached: the binding might be updated by
+    # another process
+    binding = session.query(ServerBinding).one()
+    binding.remote_token = u'some-token'
+    session.commit()
+    assert_equals(ctl.get_first_token(session), u'some-token')
+
+    # The proxy password is encrypted with the token of the database, even
+    # if the cached one is stale
+    binding.remote_token = u'other-token'
+    session.commit()
+    assert_equals(ctl.get_first_token(session), u'some-token')
+    ctl.set_proxy_settings(ProxySettings(password='secret'))
+    device_config = ctl.get_device_config(session)
+    assert_equals(decrypt(device_config.proxy_password, 'other-token'),
+                  'secret')
+    assert_equals(ctl.get_first_token(session), u'other-token')
+
+
+@with_setup(setup_controller, teardown_controller)
+def test_binding_path():
+    session = ctl.get_session()
+    binding, path = ctl._binding_path(TEST_LOCAL_FOLDER, session=session)
+    assert_equals(binding.local_folder, TEST_LOCAL_FOLDER)
+    assert_equals(path, u'/')
+    binding, path = ctl._binding_path(
+        TEST_LOCAL_FOLDER + u'/Folder/Doc.txt', session=session)
+    assert_equals(binding.local_folder, TEST_LOCAL_FOLDER)
+    assert_equals(path, u'/Folder/Doc.txt')
+
+    # A path outside of the bindings does not reset the cache after the
+    # reload
+    assert_raises(NotFound, ctl._binding_path, u'/elsewhere',
+                  session=session)
+    assert_equals(ctl._binding_folders, [TEST_LOCAL_FOLDER])
+
+    # Bindings added by another process are found on a cache miss
+    other_folder = u'/nxdrive-tests/Other Drive'
+    session.add(ServerBinding(other_folder, TEST_SERVER_URL,
+                              u'Administrator'))
+    session.commit()
+    binding, path = ctl._binding_path(other_folder + u'/Doc.txt',
+                                      session=session)
+    assert_equals(binding.local_folder, other_folder)
+    assert_equals(path, u'/Doc.txt')
+
+
+@with_setup(setup_controller, teardown_controller)
+def test_children_states():
+    session = ctl.get_session()
+    add_pair_state(session, u'/', u'root', None, u'')
+    add_pair_state(session, u'/Folder 1', u'folder-1', u'root', u'/root')
+    add_pair_state(session, u'/Folder 1/File 1.txt', u'file-1', u'folder-1',
+                   u'/root/folder-1', folderish=False)
+    add_pair_state(session, u'/Folder 1/File 2.txt', u'file-2', u'folder-1',
+                   u'/root/folder-1', folderish=False,
+                   pair_state='locally_modified')
+    add_pair_state(session, u'/Folder 2', u'folder-2', u'root', u'/root')
+    add_pair_state(session, u'/Folder 2/File 3.txt', u'file-3', u'folder-2',
+                   u'/root/folder-2', folderish=False)
+    add_pair_state(session, u'/File 4.txt', u'file-4', u'root', u'/root',
+                   folderish=False, pair_state='remotely_modified')
+    session.commit()
+
+    # The first child of Folder 1 is synchronized but not the second one
+    assert_equals(ctl.children_states(TEST_LOCAL_FOLDER), [
+        (u'File 4.txt', 'remotely_modified'),
+        (u'Folder 1', 'children_modified'),
+        (u'Folder 2', 'synchronized'),
+    ])
+    assert_equals(ctl.children_states(TEST_LOCAL_FOLDER + u'/Folder 1'), [
+        (u'File 1.txt', 'synchronized'),
+        (u'File 2.txt', 'locally_modified'),
+    ])
+
+
+@with_setup(setup_controller, teardown_controller)
+def test_count_pending():
+    session = ctl.get_session()
+    add_pair_state(session, u'/', u'root', None, u'')
+    add_pair_state(session, u'/File 1.txt', u'file-1', u'root', u'/root',
+                   folderish=False, pair_state='locally_modified')
+    add_pair_state(session, u'/File 2.txt', u'file-2', u'root', u'/root',
+                   folderish=False, pair_state='remotely_created')
+    add_pair_state(session, u'/File 3.txt', u'file-3', u'root', u'/root',
+                   folderish=False, pair_state='unsynchronized')
+    add_pair_state(session, u'/File 4.txt', u'file-4', u'root', u'/root',
+                   folderish=False, pair_state='conflicted')
+    session.commit()
+
+    assert_equals(ctl.count_pending(), 3)
+    assert_equals(ctl.count_pending(limit=2), 2)
+    assert_equals(ctl.count_pending(local_folder=TEST_LOCAL_FOLDER), 3)
+    assert_equals(ctl.count_pending(local_folder=u'/elsewhere'), 0)
+    assert_equals(ctl.count_pending(), len(ctl.list_pending()))
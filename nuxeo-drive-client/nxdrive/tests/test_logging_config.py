@@ -0,0 +1,91 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from nose.tools import assert_equals
+from nxdrive.logging_config import BufferedRotatingFileHandler
+from nxdrive.logging_config import TimeCachingFormatter
+
+
+def test_buffered_rotating_file_handler():
+    log_folder = tempfile.mkdtemp(u'-nxdrive-tests')
+    log_filename = os.path.join(log_folder, u'nxdrive.log')
+    handler = BufferedRotatingFileHandler(log_filename, delay=True)
+    handler.flush_interval = 0.2
+    logger = logging.getLogger('nxdrive.tests.buffered')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        # The first record is flushed, the next ones are buffered
+        logger.info('first')
+        assert_equals(open(log_filename).read(), 'first\n')
+        logger.info('second')
+        assert_equals(open(log_filename).read(), 'first\n')
+
+        # Warnings are flushed right away
+        logger.warning('third')
+        assert_equals(open(log_filename).read(), 'first\nsecond\nthird\n')
+
+        # Buffered records are flushed by the timer when idle
+        logger.info('fourth')
+        assert_equals(open(log_filename).read(), 'first\nsecond\nthird\n')
+        time.sleep(0.5)
+        assert_equals(open(log_filename).read(),
+                      'first\nsecond\nthird\nfourth\n')
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        shutil.rmtree(log_folder)
+
+
+def test_buffered_rotating_file_handler_rollover():
+    log_folder = tempfile.mkdtemp(u'-nxdrive-tests')
+    log_filename = os.path.join(log_folder, u'nxdrive.log')
+    handler = BufferedRotatingFileHandler(log_filename, maxBytes=16,
+                                          backupCount=1, delay=True)
+    logger = logging.getLogger('nxdrive.tests.buffered_rollover')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        # The size of the buffered records is taken into account
+        logger.info('first')
+        logger.info('second')
+        logger.warning('third')
+        assert_equals(open(log_filename + u'.1').read(), 'first\nsecond\n')
+        assert_equals(open(log_filename).read(), 'third\n')
+
+        # Closing the file, as done before forking, writes the buffered
+        # records and the file is reopened on the next record
+        logger.info('fourth')
+        handler.close()
+        assert_equals(open(log_filename).read(), 'third\nfourth\n')
+        logger.warning('fifth')
+        assert_equals(open(log_filename + u'.1').read(),
+                      'third\nfourth\n')
+        assert_equals(open(log_filename).read(), 'fifth\n')
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        shutil.rmtree(log_folder)
+
+
+def test_time_caching_formatter():
+    formatter = TimeCachingFormatter("%(asctime)s %(message)s")
+    reference = logging.Formatter("%(asctime)s %(message)s")
+    now = time.time()
+    for created in (now, now + 0.001, now + 0.5, now + 1, now + 3600.25,
+                    now):
+        record = logging.LogRecord('nxdrive.tests', logging.INFO, __file__,
+                                   1, 'Some message', (), None)
+        record.created = created
+        record.msecs = (created - long(created)) * 1000
+        assert_equals(formatter.format(record), reference.format(record))
+
+    # Explicit date formats are not cached
+    formatter = TimeCachingFormatter("%(asctime)s", datefmt="%H:%M:%S")
+    assert_equals(formatter.format(record),
+                  time.strftime("%H:%M:%S", time.localtime(record.created)))
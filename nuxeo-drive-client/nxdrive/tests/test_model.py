@@ -0,0 +1,34 @@
+import shutil
+import tempfile
+
+from nose.tools import assert_true
+from nose.tools import assert_false
+from nxdrive.model import init_db
+from nxdrive.model import LastKnownState
+
+
+def get_index_names(engine):
+    return set(row[1] for row in engine.execute(
+        "PRAGMA index_list(last_known_states)"))
+
+
+def test_create_missing_indexes():
+    nxdrive_home = tempfile.mkdtemp(u'-nxdrive-tests')
+    try:
+        engine, _ = init_db(nxdrive_home, scoped_sessions=False)
+        index_names = get_index_names(engine)
+        for index in LastKnownState.__table__.indexes:
+            assert_true(index.name in index_names)
+
+        # Simulate a database created by a previous version
+        engine.execute("DROP INDEX ix_last_known_states_local_parent")
+        assert_false('ix_last_known_states_local_parent'
+                     in get_index_names(engine))
+        engine.dispose()
+
+        engine, _ = init_db(nxdrive_home, scoped_sessions=False)
+        assert_true('ix_last_known_states_local_parent'
+                    in get_index_names(engine))
+        engine.dispose()
+    finally:
+        shutil.rmtree(nxdrive_home)
@@ -1,8 +1,24 @@
 from nose.tools import assert_true
 from nose.tools import assert_false
 from nose.tools import assert_equals
+from nose.tools import with_setup
 from nxdrive.synchronizer import name_match
 from nxdrive.synchronizer import jaccard_index
+from nxdrive.tests.common import add_pair_state
+from nxdrive.tests.common import dispose_controller
+from nxdrive.tests.common import make_controller
+
+
+ctl = None
+
+
+def setup_controller():
+    global ctl
+    ctl = make_controller()
+
+
+def teardown_controller():
+    dispose_controller(ctl)
 
 
 def test_name_match():
@@ -39,3 +55,24 @@ def test_jaccard_index():
 
     assert_equals(jaccard_index(set(['a', 'b', 'c']), ['b', 'd', 'e']), .2)
     assert_equals(jaccard_index(set(['a', 'b', 'c']), ['b', 'c', 'e']), .5)
+
+
+@with_setup(setup_controller, teardown_controller)
+def test_update_remote_parent_path_recursive():
+    session = ctl.get_session()
+    root = add_pair_state(session, u'/', u'root', None, u'')
+    folder = add_pair_state(session, u'/Folder', u'folder', u'root',
+                            u'/root')
+    sub_folder = add_pair_state(session, u'/Folder/Sub', u'sub', u'folder',
+                                u'/root/folder')
+    doc = add_pair_state(session, u'/Folder/Sub/Doc.txt', u'doc', u'sub',
+                         u'/root/folder/sub', folderish=False)
+    session.commit()
+
+    # Move the folder under a new remote parent
+    ctl.synchronizer._update_remote_parent_path_recursive(
+        session, folder, u'/root/other')
+    assert_equals(folder.remote_parent_path, u'/root/other')
+    assert_equals(sub_folder.remote_parent_path, u'/root/other/folder')
+    assert_equals(doc.remote_parent_path, u'/root/other/folder/sub')
+    assert_equals(root.remote_parent_path, u'')